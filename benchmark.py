@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmarks the boost generator against synthetic dependency graphs.
+
+The generator is driven with stand-ins for the conanfile and its
+deps_cpp_info / deps_user_info objects, with conanfile.run and subprocess
+stubbed out. Every case is generated twice: once with cold caches and once
+warm. The scenarios are:
+
+    plain           no optional feature
+    codecs          the zlib/bzip2/lzma/zstd/icu options and python
+    features        the generator options, with every probe succeeding
+    failing-probes  the same, with every probe failing
+    header-only     a consumer flagged with is_header_only
+
+    python benchmark.py [--deps 1,10,100,500] [--scenarios plain,features] [--repeat 3] [--json report.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from conans.errors import ConanException
+from conans.util.files import save
+
+import conanfile as boost_generator
+
+
+class FakeSetting(object):
+
+    def __init__(self, value, **subsettings):
+        self.value = value
+        for name, subsetting in subsettings.items():
+            setattr(self, name, subsetting)
+
+    def __str__(self):
+        return str(self.value)
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __bool__(self):
+        return bool(self.value)
+
+    __nonzero__ = __bool__
+
+
+class FakeSettings(object):
+
+    def __init__(self):
+        self.os = FakeSetting("Linux")
+        self.arch = FakeSetting("x86_64")
+        self.build_type = FakeSetting("Release")
+        self.compiler = FakeSetting("gcc", version=FakeSetting("7"), libcxx=FakeSetting("libstdc++11"))
+
+    def get_safe(self, name):
+        value = self
+        for part in name.split("."):
+            value = getattr(value, part, None)
+        return value
+
+
+class FakeOptions(object):
+
+    def __init__(self, **options):
+        self.__dict__.update(options)
+
+
+class FakeCppInfo(object):
+
+    def __init__(self, rootpath, libs=()):
+        self.rootpath = rootpath
+        self.libdirs = ["lib"]
+        self.libs = list(libs)
+        self.lib_paths = [os.path.join(rootpath, "lib")]
+        self.include_paths = [os.path.join(rootpath, "include")]
+
+
+class FakeDepsCppInfo(object):
+
+    def __init__(self, dependencies, includedirs):
+        self._dependencies = dependencies
+        self.includedirs = includedirs
+
+    def __getitem__(self, name):
+        return self._dependencies[name]
+
+    @property
+    def dependencies(self):
+        return list(self._dependencies.items())
+
+
+class FakeUserInfo(object):
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class CountingRun(object):
+    """Stands in for conanfile.run; every command succeeds, or with fail
+    every command fails, without running."""
+
+    def __init__(self, fail=False):
+        self.commands = []
+        self.fail = fail
+
+    def __call__(self, command, output=None, **kwargs):
+        self.commands.append(command)
+        if self.fail:
+            raise ConanException("Error 1 while executing %s" % command)
+
+
+class FakeOutput(object):
+
+    def __init__(self):
+        self.warnings = []
+
+    def warn(self, message):
+        self.warnings.append(message)
+
+    def info(self, message):
+        pass
+
+
+# The generator options set by the features and failing-probes scenarios
+FEATURE_OPTIONS = {
+    "b2_variants": "debug,release",
+    "b2_links": "static,shared",
+    "b2_threading": "single,multi",
+    "b2_march": "x86-64-v3",
+    "b2_visibility": "hidden",
+    "b2_gc_sections": True,
+    "b2_as_needed": True,
+    "b2_lto": "full",
+    "b2_linker": "auto",
+    "b2_compiler_launcher": "auto",
+    "b2_pch": "default",
+    "b2_unity": "4",
+    "b2_unity_exclude": "benchmark:posix/source.cpp",
+    "b2_build_cache": "auto",
+}
+
+SCENARIOS = ("plain", "codecs", "features", "failing-probes", "header-only")
+
+
+class FakeConanfile(object):
+
+    codecs = ("zlib", "bzip2", "lzma", "zstd", "icu")
+
+    def __init__(self, root, dep_count, scenario):
+        with_codecs = scenario == "codecs"
+        self.name = "boost_benchmark"
+        self.version = "1.69.0"
+        self.lib_short_names = ["benchmark"]
+        self.is_header_only = scenario == "header-only"
+        self.settings = FakeSettings()
+        self.run = CountingRun(fail=scenario == "failing-probes")
+        self.output = FakeOutput()
+        self.install_folder = os.path.join(root, "build")
+
+        options = {"shared": False}
+        if scenario in ("features", "failing-probes"):
+            options.update(FEATURE_OPTIONS)
+        if scenario == "failing-probes":
+            del options["b2_march"]  # a compiler rejecting it is an error
+        dependencies = {"boost_generator": FakeCppInfo(os.path.join(root, "generator", "package", "id"))}
+        user_info = {}
+        for codec in self.codecs:
+            options["use_" + codec] = with_codecs
+            if with_codecs:
+                dependencies[codec] = FakeCppInfo(os.path.join(root, codec), libs=[codec])
+        if with_codecs:
+            user_info["python_dev_config"] = FakeUserInfo(
+                python_exec="/usr/bin/python3", python_version="3.6", python_include_dir="/usr/include/python3.6",
+                python_lib_dir="/usr/lib", python_lib="/usr/lib/libpython3.6.so")
+        for index in range(dep_count):
+            dep_name = "boost_dep%d" % index
+            dep_root = os.path.join(root, "deps", dep_name)
+            os.makedirs(os.path.join(dep_root, "lib"))
+            open(os.path.join(dep_root, "lib", "jamroot.jam"), "w").close()
+            dependencies[dep_name] = FakeCppInfo(dep_root)
+            user_info[dep_name] = FakeUserInfo(lib_short_names="dep%d" % index)
+        self.options = FakeOptions(**options)
+        include_folder = os.path.join(root, "include")
+        for header in boost_generator.boost._default_pch_headers:
+            save(os.path.join(include_folder, header), "")
+        self.deps_cpp_info = FakeDepsCppInfo(dependencies, [include_folder])
+        self.deps_user_info = user_info
+        self.deps_env_info = {}
+        self.env_info = {}
+
+
+class FileCounter(object):
+    """Counts file reads done by the generator module through open() and load()."""
+
+    def __init__(self):
+        self.reads = 0
+        self._load = boost_generator.load
+
+    def __enter__(self):
+        counter = self
+
+        def counting_open(path, mode="r", *args, **kwargs):
+            if "r" in mode:
+                counter.reads += 1
+            return open(path, mode, *args, **kwargs)
+
+        def counting_load(path, *args, **kwargs):
+            counter.reads += 1
+            return counter._load(path, *args, **kwargs)
+
+        boost_generator.open = counting_open
+        boost_generator.load = counting_load
+        return self
+
+    def __exit__(self, *exc_info):
+        del boost_generator.open
+        boost_generator.load = self._load
+
+
+class SubprocessCounter(object):
+    """Counts processes spawned through subprocess.check_output and
+    subprocess.Popen, without running them. With fail, they all fail."""
+
+    def __init__(self, fail=False):
+        self.commands = []
+        self.fail = fail
+        self._check_output = subprocess.check_output
+        self._popen = subprocess.Popen
+
+    def __enter__(self):
+        counter = self
+
+        def counting_check_output(command, *args, **kwargs):
+            counter.commands.append(command)
+            if counter.fail:
+                raise subprocess.CalledProcessError(1, command)
+            return ""
+
+        class CountingPopen(object):
+
+            def __init__(self, command, *args, **kwargs):
+                counter.commands.append(command)
+                self.returncode = None
+
+            def communicate(self, input=None):
+                self.returncode = 1 if counter.fail else 0
+                return b"", b""
+
+            def wait(self):
+                self.communicate()
+                return self.returncode
+
+        subprocess.check_output = counting_check_output
+        subprocess.Popen = CountingPopen
+        return self
+
+    def __exit__(self, *exc_info):
+        subprocess.check_output = self._check_output
+        subprocess.Popen = self._popen
+
+
+def clear_generator_caches():
+    for name in dir(boost_generator):
+        value = getattr(boost_generator, name)
+        if name.startswith("_") and not name.startswith("__") and isinstance(value, dict):
+            value.clear()
+
+
+def generate(conanfile):
+    generator = boost_generator.boost(conanfile)
+    generator.output_path = conanfile.install_folder
+    with FileCounter() as files, SubprocessCounter(fail=conanfile.run.fail) as processes:
+        spawns_before = len(conanfile.run.commands)
+        if tracemalloc:
+            tracemalloc.start()
+        start = time.time()
+        outputs = generator.content
+        elapsed = time.time() - start
+        if tracemalloc:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            import resource
+            peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    for name, output in outputs.items():
+        save(os.path.join(conanfile.install_folder, name), output)
+    return {
+        "wall_ms": elapsed * 1000.0,
+        "subprocesses": len(conanfile.run.commands) - spawns_before + len(processes.commands),
+        "file_reads": files.reads,
+        "peak_memory_kb": peak_memory / 1024.0,
+    }
+
+
+def run_case(dep_count, scenario, repeat):
+    root = tempfile.mkdtemp(prefix="boost_generator_bench_")
+    saved_environ = dict(os.environ)
+    try:
+        export_folder = os.path.join(root, "generator", "export")
+        os.makedirs(export_folder)
+        os.makedirs(os.path.join(root, "generator", "package", "id"))
+        for exported in boost_generator.BoostGenerator.exports:
+            shutil.copy2(os.path.join(os.path.dirname(os.path.abspath(__file__)), exported), export_folder)
+        os.environ["CONAN_BOOST_GENERATOR_CACHE"] = os.path.join(root, "cache")
+        conanfile = FakeConanfile(root, dep_count, scenario)
+
+        results = {}
+        for phase in ("cold", "warm"):
+            samples = []
+            for _ in range(repeat):
+                if phase == "cold":
+                    clear_generator_caches()
+                    shutil.rmtree(os.environ["CONAN_BOOST_GENERATOR_CACHE"], ignore_errors=True)
+                samples.append(generate(conanfile))
+            results[phase] = min(samples, key=lambda sample: sample["wall_ms"])
+        return results
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the boost generator")
+    parser.add_argument("--deps", default="1,10,50,100,250,500",
+                        help="comma separated dependency counts (default: %(default)s)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma separated scenarios (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="samples per case, best is reported")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios.split(",")
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error("unknown scenario(s): %s" % ", ".join(unknown))
+
+    rows = []
+    print("%6s %14s %5s %10s %6s %6s %10s" % ("deps", "scenario", "phase", "wall ms", "procs", "reads", "peak KiB"))
+    for dep_count in [int(count) for count in args.deps.split(",")]:
+        for scenario in scenarios:
+            results = run_case(dep_count, scenario, args.repeat)
+            for phase in ("cold", "warm"):
+                result = results[phase]
+                rows.append(dict(result, deps=dep_count, scenario=scenario, phase=phase))
+                print("%6d %14s %5s %10.2f %6d %6d %10.1f" % (
+                    dep_count, scenario, phase, result["wall_ms"],
+                    result["subprocesses"], result["file_reads"], result["peak_memory_kb"]))
+
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(rows, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
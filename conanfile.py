@@ -3,11 +3,21 @@
 
 from conans.model.conan_generator import Generator
 from conans import ConanFile, tools, load
+from conans.errors import ConanException
+from conans.util.files import normalize
+import fasteners
+import contextlib
 import glob
+import hashlib
+import json
 import locale
+import re
+import shlex
+import shutil
 import subprocess
 import os
 import sys
+import time
 
 # This is the normal packaging info since generators
 # get published just like other packages. Although
@@ -21,12 +31,600 @@ class BoostGenerator(ConanFile):
     url = "https://github.com/bincrafters/conan-boost_generator"
     description = "Conan build generator for boost libraries http://www.boost.org/doc/libs/1_69_0/libs/libraries.htm"
     license = "BSL"
-    exports = "boostcpp.jam", "jamroot.template", "project-config.template.jam"
+    exports = "boostcpp.jam", "jamroot.template", "project-config.template.jam", "short_path.cmd"
     requires = "boost_build/1.69.0@bincrafters/testing"
 
 # Below is the actual generator code
 
 
+class _NullTrace(object):
+    """Stands in for _Trace when tracing is disabled."""
+
+    def timed(self, category, name, **details):
+        return self
+
+    def file(self, path, action):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Trace(object):
+    """Timings, external commands and files touched during one generation.
+
+    Enabled by setting CONAN_BOOST_GENERATOR_TRACE, and written as
+    boost-generator-trace.json next to the generated jamroot.
+    """
+
+    filename = "boost-generator-trace.json"
+
+    def __init__(self):
+        self.started = time.time()
+        self.records = {"properties": [], "placeholders": [], "commands": [], "files": []}
+
+    @staticmethod
+    def enabled():
+        return os.environ.get("CONAN_BOOST_GENERATOR_TRACE", "").lower() in ("1", "true", "yes", "on")
+
+    @contextlib.contextmanager
+    def timed(self, category, name, **details):
+        start = time.time()
+        try:
+            yield
+        finally:
+            details.update(name=name, ms=round((time.time() - start) * 1000.0, 3))
+            self.records[category].append(details)
+
+    def file(self, path, action):
+        self.records["files"].append({"name": path, "action": action})
+
+    def report(self):
+        return json.dumps(dict(self.records, total_ms=round((time.time() - self.started) * 1000.0, 3)),
+                          indent=2, sort_keys=True)
+
+
+_trace = _NullTrace()
+
+
+def _boost_generator_cache_dir():
+    cache_dir = os.environ.get("CONAN_BOOST_GENERATOR_CACHE")
+    if not cache_dir:
+        user_home = os.environ.get("CONAN_USER_HOME", os.path.expanduser("~"))
+        cache_dir = os.path.join(user_home, ".conan", "boost_generator")
+    return cache_dir
+
+
+def _make_folder(folder):
+    if not os.path.isdir(folder):
+        try:
+            os.makedirs(folder)
+        except OSError:
+            if not os.path.isdir(folder):
+                raise
+
+
+def _replace(temp_path, path):
+    try:
+        os.replace(temp_path, path)
+    except AttributeError:
+        # Python 2 has no os.replace, and os.rename does not overwrite on Windows
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+
+def _save_atomic(path, content):
+    _make_folder(os.path.dirname(path))
+    _trace.file(path, "write")
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "w") as temp_file:
+        temp_file.write(content)
+    _replace(temp_path, path)
+
+
+_FICLONE = 0x40049409  # ioctl number of FICLONE on Linux
+
+
+def _copy_file_data(source, destination):
+    """Copies the data of ``source`` into ``destination`` in the kernel when
+    possible: as a reflink, then with copy_file_range, then with a plain copy."""
+    with open(source, "rb") as source_file:
+        with open(destination, "wb") as destination_file:
+            try:
+                import fcntl
+                fcntl.ioctl(destination_file.fileno(), _FICLONE, source_file.fileno())
+                return
+            except (ImportError, IOError, OSError):
+                pass
+            if hasattr(os, "copy_file_range"):
+                try:
+                    remaining = os.fstat(source_file.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(source_file.fileno(), destination_file.fileno(), remaining)
+                        if copied <= 0:
+                            break
+                        remaining -= copied
+                    if remaining <= 0:
+                        return
+                except OSError:
+                    pass
+                source_file.seek(0)
+                destination_file.seek(0)
+                destination_file.truncate()
+            shutil.copyfileobj(source_file, destination_file)
+
+
+def _place_file(source, destination):
+    """Places a copy of ``source`` at ``destination``, carrying over its
+    modification time. Returns False if ``destination`` was already up to date."""
+    source_stat = os.stat(source)
+    try:
+        destination_stat = os.stat(destination)
+        if destination_stat.st_size == source_stat.st_size and \
+                destination_stat.st_mtime == source_stat.st_mtime:
+            return False
+    except OSError:
+        pass
+    _make_folder(os.path.dirname(destination))
+    _trace.file(destination, "write")
+    temp_path = "%s.%d.tmp" % (destination, os.getpid())
+    try:
+        _copy_file_data(source, temp_path)
+        os.utime(temp_path, (source_stat.st_atime, source_stat.st_mtime))
+        _replace(temp_path, destination)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+class _ProbeCache(object):
+    """Results of external tool probes, persisted across generator runs.
+
+    Each entry is stored under a key describing what was probed, together with
+    the modification times of the executables involved. An entry is only valid
+    as long as those executables have not changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+        self._mtime = None
+
+    def _refresh(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self._entries is None or mtime != self._mtime:
+            entries = {}
+            if mtime is not None:
+                _trace.file(self.path, "read")
+                try:
+                    with open(self.path) as cache_file:
+                        entries = json.load(cache_file)
+                except (IOError, ValueError):
+                    entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+            self._mtime = mtime
+
+    def lookup(self, key, stamps):
+        self._refresh()
+        entry = self._entries.get(key)
+        if entry is not None and entry.get("stamps") == stamps:
+            return True, entry.get("result")
+        return False, None
+
+    def store(self, key, stamps, result):
+        self._refresh()
+        self._entries[key] = {"stamps": stamps, "result": result}
+        try:
+            _save_atomic(self.path, json.dumps(self._entries, indent=2, sort_keys=True))
+            self._mtime = os.path.getmtime(self.path)
+        except (IOError, OSError):
+            pass  # a cache we cannot write is just a cold cache
+
+
+def _folder_size(folder):
+    size = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+class _BuildCache(object):
+    """b2 build directories shared between generations, one per configuration
+    fingerprint, evicted least recently used first beyond max_size bytes.
+
+    An index keeps when each entry was last used and how large it was when
+    last measured. An entry is only measured again after it has been used,
+    so a generation walks the entries built since the previous one at most.
+    The index is only updated under an inter-process lock, and entries used
+    within the grace period are never evicted.
+
+    A b2 process building in an entry holds its lock, the <entry>.lock
+    directory, for the whole build; the jamroot creates it and removes it
+    once the build is over. Locked entries are not evicted, and locks older
+    than the grace period are taken for leftovers of interrupted builds.
+    """
+
+    index_name = "index.json"
+    grace_period = 24 * 3600
+    _entry_name = re.compile(r"^[0-9a-f]{32}$")
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self.index_path = os.path.join(root, self.index_name)
+
+    def lock_path(self, fingerprint):
+        return os.path.join(self.root, fingerprint + ".lock")
+
+    def _load_index(self):
+        _trace.file(self.index_path, "read")
+        try:
+            with open(self.index_path) as index_file:
+                index = json.load(index_file)
+        except (IOError, ValueError):
+            index = {}
+        return index if isinstance(index, dict) else {}
+
+    def entry(self, fingerprint):
+        """Returns the build directory for fingerprint, recording its use."""
+        _make_folder(self.root)
+        with fasteners.InterProcessLock(self.index_path + ".lock"):
+            index = self._load_index()
+            now = time.time()
+            # Directories missing from the index still count towards its size
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if name not in index and self._entry_name.match(name) and os.path.isdir(path):
+                    index[name] = {"used": os.path.getmtime(path)}
+                elif name.endswith(".lock") and self._entry_name.match(name[:-len(".lock")]) and \
+                        os.path.getmtime(path) < now - self.grace_period:
+                    _trace.file(path, "remove")
+                    try:
+                        os.rmdir(path)
+                    except OSError:
+                        pass
+            for name, record in list(index.items()):
+                path = os.path.join(self.root, name)
+                if not os.path.isdir(path):
+                    if name != fingerprint:
+                        del index[name]
+                elif record.get("measured", 0) < record.get("used", 0):
+                    _trace.file(path, "walk")
+                    record["size"] = _folder_size(path)
+                    record["measured"] = now
+            index[fingerprint] = dict(index.get(fingerprint, {}), used=now)
+            self._evict(index, now)
+            try:
+                _save_atomic(self.index_path, json.dumps(index, indent=2, sort_keys=True))
+            except (IOError, OSError):
+                pass
+        return os.path.join(self.root, fingerprint).replace('\\', '/')
+
+    def _evict(self, index, now):
+        total = sum(record.get("size", 0) for record in index.values())
+        for name in sorted(index, key=lambda name: index[name].get("used", 0)):
+            if total <= self.max_size or index[name].get("used", 0) > now - self.grace_period:
+                break
+            if os.path.isdir(self.lock_path(name)):
+                continue
+            _trace.file(os.path.join(self.root, name), "remove")
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= index.pop(name).get("size", 0)
+
+
+class _JamTemplate(object):
+    """A jam template parsed once into literal text and {{{placeholder}}} names.
+
+    Rendering is a single pass over the parsed pieces. Placeholder values are
+    resolved lazily, at most once each, and only if the template uses them.
+    """
+
+    _placeholder = re.compile(r"\{\{\{([^{}]*)\}\}\}")
+
+    def __init__(self, text, name="template"):
+        self.name = name
+        self._pieces = []
+        position = 0
+        for match in self._placeholder.finditer(text):
+            self._pieces.append((text[position:match.start()], match.group(1)))
+            position = match.end()
+        self._pieces.append((text[position:], None))
+        self.placeholders = frozenset(placeholder for _, placeholder in self._pieces if placeholder is not None)
+
+    def render(self, values):
+        """Renders the template. ``values`` maps placeholder names to strings
+        or to callables returning strings."""
+        unknown = self.placeholders.difference(values)
+        if unknown:
+            raise ConanException("%s: unknown placeholders %s" % (
+                self.name, ", ".join("{{{%s}}}" % placeholder for placeholder in sorted(unknown))))
+        resolved = {}
+        parts = []
+        for literal, placeholder in self._pieces:
+            parts.append(literal)
+            if placeholder is None:
+                continue
+            if placeholder not in resolved:
+                value = values[placeholder]
+                if callable(value):
+                    with _trace.timed("placeholders", placeholder, template=self.name):
+                        value = value()
+                if value is None:
+                    raise ConanException("%s: placeholder {{{%s}}} was not filled" % (self.name, placeholder))
+                resolved[placeholder] = value
+            parts.append(resolved[placeholder])
+        return "".join(parts)
+
+
+def _resolved_once(method):
+    """Property that is computed at most once while a toolchain is being resolved."""
+    name = method.__name__
+
+    def getter(self):
+        memo = getattr(self, "_resolving", None)
+        if memo is None:
+            return method(self)
+        if name not in memo:
+            with _trace.timed("properties", name):
+                memo[name] = method(self)
+        return memo[name]
+
+    return property(getter, doc=method.__doc__)
+
+
+class _ResolvedToolchain(object):
+    """Immutable snapshot of the b2_* toolchain properties of one generation.
+
+    Fields are named after the properties without their 'b2_' prefix.
+    """
+
+    __slots__ = ("toolset", "toolset_version", "toolset_exec", "os", "address_model", "architecture",
+                 "variant", "link", "runtime_link", "variants", "links", "runtime_links", "threading",
+                 "threadapi", "libcxx", "cxxstd", "cxxabi", "arch_flags", "isysroot", "os_version",
+                 "fpic", "profile_flags", "archive_tools", "compiler_launcher", "lto_flags", "pgo_flags",
+                 "cpu_flags", "shared_flags", "linker_flags", "pch_headers")
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            object.__setattr__(self, field, values[field])
+
+    # What the fields needing external processes or filesystem access
+    # resolve to for header-only consumers, which compile nothing
+    header_only_values = {
+        "toolset_exec": "$(DEFAULT)",
+        "isysroot": "",
+        "archive_tools": "",
+        "compiler_launcher": "",
+        "lto_flags": "",
+        "pgo_flags": "",
+        "cpu_flags": "",
+        "linker_flags": "",
+        "pch_headers": "",
+    }
+
+    @classmethod
+    def resolve(cls, generator, overrides=None):
+        overrides = overrides or {}
+        generator._resolving = {}
+        try:
+            return cls(**dict((field, overrides[field] if field in overrides else getattr(generator, "b2_" + field))
+                              for field in cls.__slots__))
+        finally:
+            generator._resolving = None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("resolved toolchain is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("resolved toolchain is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, _ResolvedToolchain) and self.as_tuple() == other.as_tuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__,
+                           ", ".join("%s=%r" % (field, getattr(self, field)) for field in self.__slots__))
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def as_dict(self):
+        return dict((field, getattr(self, field)) for field in self.__slots__)
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(**json.loads(text))
+
+
+_template_cache = {}
+
+
+def _cached_template(path):
+    """Returns the (text, compiled template) pair for ``path``, reloading
+    it only when its modification time changes."""
+    mtime = os.path.getmtime(path)
+    entry = _template_cache.get(path)
+    if entry is None or entry[0] != mtime:
+        _trace.file(path, "read")
+        text = load(path)
+        entry = (mtime, text, _JamTemplate(text, os.path.basename(path)))
+        _template_cache[path] = entry
+    return entry[1], entry[2]
+
+
+_export_paths = {}
+
+
+class _JamDependency(object):
+    """A dependency libdir holding a jamroot.jam, and the jam lines referencing it."""
+
+    __slots__ = ("dep_name", "libdir", "lib_short_name", "dep_short_names", "jam_lines")
+
+    def __init__(self, dep_name, libdir, dep_short_names):
+        self.dep_name = dep_name
+        self.libdir = libdir.replace('\\', '/')
+        self.lib_short_name = os.path.basename(os.path.dirname(libdir))
+        self.dep_short_names = tuple(dep_short_names)
+        lib_project_name = '"/%s,%s"' % (dep_name, self.lib_short_name)
+        self.jam_lines = tuple(
+            ['use-project %s : "%s" ;' % (lib_project_name, self.libdir),
+             'alias "%s" : %s ;' % (self.lib_short_name, lib_project_name)] +
+            ['"LIBRARY_DIR(%s)" = "%s" ;' % (dep_short_name, self.libdir)
+             for dep_short_name in self.dep_short_names])
+
+
+_jam_dependency_index = {}
+
+
+def _jam_paths(paths):
+    return " ".join('"%s"' % path.replace('\\', '/') for path in paths)
+
+
+class _NativeDependency(object):
+    """An optional third-party library Boost can be built against.
+
+    It is enabled by the consumer option ``option`` and provided by the Conan
+    package ``package``. With a ``module``, project-config.jam configures it
+    with ``using <module>``, also passing the library name if ``pass_name``,
+    or disables it with NO_<NAME> when it is not available.
+    """
+
+    __slots__ = ("name", "option", "package", "module", "pass_name")
+
+    def __init__(self, name, option, package, module=None, pass_name=False):
+        self.name = name
+        self.option = option
+        self.package = package
+        self.module = module
+        self.pass_name = pass_name
+
+    def resolve(self, options, deps_build_info):
+        """Returns (lib_paths, include_paths, lib_name) if enabled and
+        provided, None otherwise."""
+        try:
+            if not getattr(options, self.option):
+                return None
+        except (AttributeError, ConanException):
+            return None
+        try:
+            cpp_info = deps_build_info[self.package]
+        except KeyError:
+            return None
+        lib_name = os.path.basename(cpp_info.libs[0]) if cpp_info.libs else ""
+        return tuple(cpp_info.lib_paths), tuple(cpp_info.include_paths), lib_name
+
+    def jam_lines(self, resolved):
+        if not resolved or not resolved[1]:
+            return ["modules.poke : NO_%s : 1 ;" % self.name.upper()]
+        lib_paths, include_paths, lib_name = resolved
+        requirements = ["<include>" + _jam_paths([path]) for path in include_paths]
+        requirements += ["<search>" + _jam_paths([path]) for path in lib_paths]
+        if self.pass_name and lib_name:
+            requirements.append("<name>" + lib_name)
+        return ["using %s : : %s ;" % (self.module, " ".join(requirements))]
+
+
+# Adding a dependency is adding an entry here
+_native_dependencies = (
+    _NativeDependency("zlib", "use_zlib", "zlib", module="zlib"),
+    _NativeDependency("bzip2", "use_bzip2", "bzip2", module="bzip2"),
+    _NativeDependency("lzma", "use_lzma", "lzma", module="lzma", pass_name=True),
+    _NativeDependency("zstd", "use_zstd", "zstd", module="zstd", pass_name=True),
+    _NativeDependency("icu", "use_icu", "icu"),
+)
+
+
+def _split_command(command, variable=None):
+    """Splits a command line such as CXX='ccache g++' into its words.
+
+    ``variable`` names the environment variable the command comes from, for
+    the error raised when it can not be split."""
+    if os.path.isfile(command):
+        return [command]
+    try:
+        words = shlex.split(command, posix=os.name != "nt")
+    except ValueError as e:
+        raise ConanException("Invalid %s: %s (%s)" % (variable or "command", command, e))
+    return [word.strip('"') for word in words]
+
+
+def _read_first_line(path):
+    try:
+        with open(path) as file_handle:
+            return file_handle.readline().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _cgroup_cpu_limit():
+    """Returns the CPU quota of the current cgroup, rounded up, or None."""
+    cpu_max = _read_first_line("/sys/fs/cgroup/cpu.max")  # cgroup v2
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+    else:  # cgroup v1
+        quota = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    try:
+        quota, period = int(quota), int(period)
+    except (TypeError, ValueError):
+        return None  # no cgroup, or "max"
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, -(-quota // period))
+
+
+def _available_memory():
+    """Returns the memory available for compiling, in bytes, or None."""
+    available = None
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (IOError, OSError, ValueError):
+        pass
+    for limit_path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            limit = int(_read_first_line(limit_path))
+        except (TypeError, ValueError):
+            continue
+        available = limit if available is None else min(available, limit)
+    return available
+
+
+_probe_caches = {}
+
+
+def _probe_cache():
+    path = os.path.join(_boost_generator_cache_dir(), "probes.json")
+    if path not in _probe_caches:
+        _probe_caches[path] = _ProbeCache(path)
+    return _probe_caches[path]
+
+
 class boost(Generator):
 
     @property
@@ -36,116 +634,450 @@ class boost(Generator):
     @property
     def content(self):
         # print("@@@@@@@@ BoostGenerator:boost.content: " + str(self.conanfile))
+        global _trace
+        trace = _Trace() if _Trace.enabled() else None
+        if trace:
+            _trace = trace
         try:
-            jam_include_paths = ' '.join('"' + path + '"' for path in self.conanfile.deps_cpp_info.includedirs).replace('\\', '/')
-
-            libraries_to_build = " ".join(self.conanfile.lib_short_names)
-
-            jamroot_content = self.get_template_content() \
-                .replace("{{{toolset}}}", self.b2_toolset) \
-                .replace("{{{libraries}}}", libraries_to_build) \
-                .replace("{{{boost_version}}}", self.conanfile.version) \
-                .replace("{{{deps.include_paths}}}", jam_include_paths) \
-                .replace("{{{os}}}", self.b2_os) \
-                .replace("{{{address_model}}}", self.b2_address_model) \
-                .replace("{{{architecture}}}", self.b2_architecture) \
-                .replace("{{{deps_info}}}", self.get_deps_info_for_jamfile()) \
-                .replace("{{{variant}}}", self.b2_variant) \
-                .replace("{{{name}}}", self.conanfile.name) \
-                .replace("{{{link}}}", self.b2_link) \
-                .replace("{{{runtime_link}}}", self.b2_runtime_link) \
-                .replace("{{{toolset_version}}}", self.b2_toolset_version) \
-                .replace("{{{toolset_exec}}}", self.b2_toolset_exec) \
-                .replace("{{{libcxx}}}", self.b2_libcxx) \
-                .replace("{{{cxxstd}}}", self.b2_cxxstd) \
-                .replace("{{{cxxabi}}}", self.b2_cxxabi) \
-                .replace("{{{libpath}}}", self.b2_icu_lib_paths) \
-                .replace("{{{arch_flags}}}", self.b2_arch_flags) \
-                .replace("{{{isysroot}}}", self.b2_isysroot) \
-                .replace("{{{os_version}}}", self.b2_os_version) \
-                .replace("{{{fpic}}}", self.b2_fpic) \
-                .replace("{{{threading}}}", self.b2_threading) \
-                .replace("{{{threadapi}}}", self.b2_threadapi) \
-                .replace("{{{profile_flags}}}", self.b2_profile_flags)
-
-            return {
+            toolchain = self.resolve_toolchain()
+
+            jamroot_content = self.get_template("jamroot.template").render(self.jamroot_placeholders(toolchain))
+
+            outputs = {
                 "jamroot" : jamroot_content,
-                "boostcpp.jam" : self.get_boostcpp_content(),
-                "project-config.jam" : self.get_project_config_content(),
-                "short_path.cmd" : "@echo off\nECHO %~s1"
+                "project-config.jam" : self.get_project_config_content(toolchain),
+                "boost-toolchain.json" : toolchain.to_json(),
+                "b2-options.txt" : "" if self.header_only else self.get_b2_options_content()
                 }
+            outputs.update(self.place_static_files())
+            if not self.header_only:
+                outputs.update(self.get_pch_header_contents(toolchain))
+            outputs = self.changed_outputs(outputs)
+            if trace:
+                outputs[trace.filename] = trace.report()
+            return outputs
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise e
+        finally:
+            _trace = _NullTrace()
+
+    manifest_filename = "boost-generator.manifest"
 
-    def get_template_content(self):
-        template_file_path = os.path.join(self.get_boost_generator_source_path(), "jamroot.template")
-        template_content = load(template_file_path)
-        return template_content
+    @property
+    def output_folder(self):
+        return getattr(self, "output_path", None) or getattr(self.conanfile, "install_folder", None)
+
+    def changed_outputs(self, outputs):
+        """Drops the outputs whose content is unchanged since the last generation.
+
+        Conan rewrites every file it is given, and the fresh timestamps make b2
+        re-evaluate the project. A manifest of content hashes is kept next to
+        the outputs; files matching it, and still present on disk with the
+        expected size, are left untouched. Hashes and sizes are those of the
+        bytes Conan writes, after its line ending normalization (always done
+        by the Conan versions whose generators have no normalize attribute).
+
+        Conan writes, and reports as created, exactly the files in the returned
+        dict and never removes generated files, so the unchanged ones are left
+        out of it and stay on disk as they are.
+        """
+        output_folder = self.output_folder
+        if not output_folder:
+            return outputs
+        manifest_path = os.path.join(output_folder, self.manifest_filename)
+        _trace.file(manifest_path, "read")
+        try:
+            with open(manifest_path) as manifest_file:
+                old_manifest = json.load(manifest_file)
+        except (IOError, ValueError):
+            old_manifest = {}
+
+        changed = {}
+        manifest = {}
+        for name, content in outputs.items():
+            data = (normalize(content) if getattr(self, "normalize", True) else content).encode("utf-8")
+            entry = {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+            manifest[name] = entry
+            try:
+                unchanged = old_manifest.get(name) == entry and \
+                    os.path.getsize(os.path.join(output_folder, name)) == entry["size"]
+            except OSError:
+                unchanged = False
+            if not unchanged:
+                changed[name] = content
+
+        if changed or manifest != old_manifest:
+            changed[self.manifest_filename] = json.dumps(manifest, indent=2, sort_keys=True)
+        return changed
+
+    static_files = ["boostcpp.jam", "short_path.cmd"]
+
+    def place_static_files(self):
+        """Copies the files that need no rendering from the export folder
+        straight into the output folder.
+
+        Returns the contents of the ones that could not be placed that way,
+        to be written by Conan instead.
+        """
+        outputs = {}
+        output_folder = self.output_folder
+        source_path = self.get_boost_generator_source_path()
+        for static_file in self.static_files:
+            source = os.path.join(source_path, static_file)
+            if output_folder and os.path.isfile(source):
+                try:
+                    _place_file(source, os.path.join(output_folder, static_file))
+                    continue
+                except (IOError, OSError):
+                    pass
+            if static_file == "boostcpp.jam":
+                outputs[static_file] = self.get_boostcpp_content()
+            else:
+                outputs[static_file] = "@echo off\nECHO %~s1"
+        return outputs
+
+    def get_template(self, template_name):
+        template_file_path = os.path.join(self.get_boost_generator_source_path(), template_name)
+        return _cached_template(template_file_path)[1]
+
+    def resolve_toolchain(self):
+        if self.header_only:
+            return _ResolvedToolchain.resolve(self, _ResolvedToolchain.header_only_values)
+        return _ResolvedToolchain.resolve(self)
+
+    @property
+    def header_only(self):
+        """True for consumers flagged with is_header_only, which build no
+        library. Their jamroot and project-config are generated without
+        probing the toolchain or scanning the dependencies."""
+        return getattr(self.conanfile, "is_header_only", False) is True
+
+    def jamroot_placeholders(self, toolchain):
+        placeholders = {
+            "toolset": toolchain.toolset,
+            "libraries": lambda: " ".join(getattr(self.conanfile, "lib_short_names", [])),
+            "boost_version": lambda: self.conanfile.version,
+            "deps.include_paths": lambda: ' '.join(
+                '"' + path + '"' for path in self.conanfile.deps_cpp_info.includedirs).replace('\\', '/'),
+            "os": toolchain.os,
+            "address_model": toolchain.address_model,
+            "architecture": toolchain.architecture,
+            "deps_info": self.get_deps_info_for_jamfile,
+            "variants": toolchain.variants,
+            "name": lambda: self.conanfile.name,
+            "links": lambda: " ".join("<link>" + link for link in toolchain.links.split()),
+            "runtime_links": lambda: " ".join(
+                "<runtime-link>" + runtime_link for runtime_link in toolchain.runtime_links.split()),
+            "layout": lambda: self.get_layout_override(toolchain),
+            "launcher_stats": lambda: self.get_launcher_stats(toolchain),
+            "pch": lambda: self.get_pch_for_jamfile(toolchain),
+            "unity": self.get_unity_for_jamfile,
+            "toolset_version": toolchain.toolset_version,
+            "toolset_exec": toolchain.toolset_exec,
+            "libcxx": toolchain.libcxx,
+            "cxxstd": toolchain.cxxstd,
+            "cxxabi": toolchain.cxxabi,
+            "libpath": lambda: self.b2_icu_lib_paths,
+            "arch_flags": toolchain.arch_flags,
+            "cpu_flags": toolchain.cpu_flags,
+            "isysroot": toolchain.isysroot,
+            "os_version": toolchain.os_version,
+            "fpic": toolchain.fpic,
+            "shared_flags": toolchain.shared_flags,
+            "linker_flags": toolchain.linker_flags,
+            "threading": lambda: " ".join("<threading>" + threading for threading in toolchain.threading.split()),
+            "threadapi": toolchain.threadapi,
+            "profile_flags": toolchain.profile_flags,
+            "lto_flags": toolchain.lto_flags,
+            "pgo_flags": toolchain.pgo_flags,
+            "build_cache": lambda: self.get_build_cache_for_jamfile(toolchain),
+        }
+        if self.header_only:
+            placeholders.update(self.header_only_jamroot_placeholders)
+        return placeholders
+
+    # LIBRARIES is kept: the project requirements include $(LIBRARIES)/include
+    header_only_jamroot_placeholders = {
+        "deps_info": "",
+        "pch": "",
+        "unity": "",
+    }
 
     def get_boostcpp_content(self):
         boostcpp_file_path = os.path.join(self.get_boost_generator_source_path(), "boostcpp.jam")
-        boostcpp_content = load(boostcpp_file_path)
-        return boostcpp_content
+        return _cached_template(boostcpp_file_path)[0]
 
     def get_boost_generator_source_path(self):
         boost_generator = self.conanfile.deps_cpp_info["boost_generator"]
         boost_generator_root_path = boost_generator.rootpath
-        boost_generator_source_path = os.path.join(boost_generator_root_path, os.pardir, os.pardir, "export")
-        return boost_generator_source_path
+        if boost_generator_root_path not in _export_paths:
+            _export_paths[boost_generator_root_path] = os.path.normpath(
+                os.path.join(boost_generator_root_path, os.pardir, os.pardir, "export"))
+        return _export_paths[boost_generator_root_path]
 
     def get_deps_info_for_jamfile(self):
-        deps_info = []
-        for dep_name, dep_cpp_info in self.deps_build_info.dependencies:
+        return "\n".join(line
+                         for dep_name, dep_cpp_info in self.deps_build_info.dependencies
+                         for jam_dep in self.get_jam_dependencies(dep_name, dep_cpp_info)
+                         for line in jam_dep.jam_lines)
+
+    def get_jam_dependencies(self, dep_name, dep_cpp_info):
+        """Returns the jamroot-bearing libdirs of a dependency, cached per package."""
+        key = (dep_name, dep_cpp_info.rootpath, tuple(dep_cpp_info.libdirs))
+        if key not in _jam_dependency_index:
+            try:
+                dep_short_names = self.conanfile.deps_user_info[dep_name].lib_short_names.split(",")
+            except KeyError:
+                dep_short_names = []
+            jam_deps = []
             for libdir in dep_cpp_info.libdirs:
                 dep_libdir = os.path.join(dep_cpp_info.rootpath, libdir)
+                _trace.file(os.path.join(dep_libdir, "jamroot.jam"), "stat")
                 if os.path.isfile(os.path.join(dep_libdir, "jamroot.jam")):
-                    lib_short_name = os.path.basename(os.path.dirname(dep_libdir))
-                    lib_project_name = "\"/" + dep_name + "," + lib_short_name + "\""
-                    deps_info.append(
-                        "use-project " + lib_project_name + " : \"" + dep_libdir.replace('\\', '/') + "\" ;")
-                    deps_info.append(
-                        "alias \"" + lib_short_name + "\" : " + lib_project_name + " ;")
-                    try:
-                        dep_short_names = self.conanfile.deps_user_info[dep_name].lib_short_names.split(",")
-                        for dep_short_name in dep_short_names:
-                            deps_info.append(
-                                '"LIBRARY_DIR(' + dep_short_name + ')" = "' + dep_libdir.replace('\\', '/') + '" ;')
-                    except KeyError:
-                        pass
+                    jam_deps.append(_JamDependency(dep_name, dep_libdir, dep_short_names))
+            _jam_dependency_index[key] = tuple(jam_deps)
+        return _jam_dependency_index[key]
+
+    def get_layout_override(self, toolchain):
+        # Several variants or runtimes installed side by side need tagged
+        # library names to not overwrite each other.
+        if len(toolchain.variants.split()) > 1 or len(toolchain.runtime_links.split()) > 1:
+            return 'if [ modules.peek boostcpp : layout ] = system\n' \
+                   '{\n' \
+                   '    modules.poke boostcpp : layout : tagged ;\n' \
+                   '}'
+        return ''
 
-        deps_info = "\n".join(deps_info)
-        return deps_info
-
-    def get_project_config_content(self):
-        project_config_content_file_path = os.path.join(self.get_boost_generator_source_path(),
-                                                        "project-config.template.jam")
-        project_config_content = load(project_config_content_file_path)
-        return project_config_content \
-            .replace("{{{toolset}}}", self.b2_toolset) \
-            .replace("{{{toolset_version}}}", self.b2_toolset_version) \
-            .replace("{{{toolset_exec}}}", self.b2_toolset_exec) \
-            .replace("{{{zlib_lib_paths}}}", self.zlib_lib_paths) \
-            .replace("{{{zlib_include_paths}}}", self.zlib_include_paths) \
-            .replace("{{{zlib_name}}}", self.zlib_lib_name) \
-            .replace("{{{bzip2_lib_paths}}}", self.bzip2_lib_paths) \
-            .replace("{{{bzip2_include_paths}}}", self.bzip2_include_paths) \
-            .replace("{{{bzip2_name}}}", self.bzip2_lib_name) \
-            .replace("{{{lzma_lib_paths}}}", self.lzma_lib_paths) \
-            .replace("{{{lzma_include_paths}}}", self.lzma_include_paths) \
-            .replace("{{{lzma_name}}}", self.lzma_lib_name) \
-            .replace("{{{zstd_lib_paths}}}", self.zstd_lib_paths) \
-            .replace("{{{zstd_include_paths}}}", self.zstd_include_paths) \
-            .replace("{{{zstd_name}}}", self.zstd_lib_name) \
-            .replace("{{{python_exec}}}", self.b2_python_exec) \
-            .replace("{{{python_version}}}", self.b2_python_version) \
-            .replace("{{{python_include}}}", self.b2_python_include) \
-            .replace("{{{python_lib}}}", self.b2_python_lib) \
-            .replace("{{{mpicxx}}}", self.b2_mpicxx) \
-            .replace("{{{profile_tools}}}", self.b2_profile_tools)
+    def get_build_cache_for_jamfile(self, toolchain):
+        """Points b2 at a build directory of a cache shared by all the builds
+        of this host, named after a fingerprint of the configuration, when
+        the b2_build_cache option is set. The jamroot builds in 'bin' in the
+        build folder otherwise, or when another build holds the entry's lock.
+
+        b2_build_cache is 'none', 'auto' (under the generator cache) or a
+        path; b2_build_cache_size bounds the cache in MiB (default 20480).
+        """
+        cache = self.generator_choice("b2_build_cache")
+        if cache is None or self.header_only:
+            return ''
+        if cache.lower() in ("auto", "true", "1"):
+            cache = os.path.join(_boost_generator_cache_dir(), "build-cache")
+        max_size = self.generator_option("b2_build_cache_size", "20480")
+        try:
+            max_size = int(max_size) * 1024 * 1024
+        except ValueError:
+            raise ConanException("Invalid value for b2_build_cache_size: %s" % max_size)
+        build_cache = _BuildCache(os.path.abspath(cache), max_size)
+        fingerprint = self.get_build_fingerprint(toolchain)
+        build_dir = build_cache.entry(fingerprint)
+        # The lock is made and removed by shell commands: a native path, its
+        # backslashes escaped for jam
+        lock_path = os.path.normpath(build_cache.lock_path(fingerprint)).replace('\\', '\\\\')
+        return 'BUILD_CACHE_DIR = "%s" ;\nBUILD_CACHE_LOCK = "%s" ;' % (build_dir, lock_path)
+
+    # Snapshot fields that select what is built rather than how: b2 already
+    # keeps the targets of different variants, link types and threading
+    # apart within a build directory
+    _build_fingerprint_ignored = ("variant", "link", "runtime_link", "variants", "links", "runtime_links",
+                                  "threading", "compiler_launcher", "pch_headers")
+
+    def get_build_fingerprint(self, toolchain):
+        """Fingerprint of what affects compilation: the Boost version, the
+        toolset, its command, flags and defines, and the include directories.
+
+        Not the package name, its libraries or its dependencies' paths, so
+        that packages and re-exports compiling alike share a cache entry.
+        """
+        compilation = dict((field, value) for field, value in toolchain.as_dict().items()
+                           if field not in self._build_fingerprint_ignored)
+        fingerprint = hashlib.sha256()
+        for part in (self.conanfile.version, self.get_boostcpp_content(),
+                     json.dumps(compilation, sort_keys=True),
+                     json.dumps(list(self.conanfile.deps_cpp_info.includedirs)),
+                     json.dumps(self.native_dependencies, sort_keys=True),
+                     json.dumps([self.b2_python_version, self.b2_python_include, self.b2_python_lib])):
+            fingerprint.update(str(part).encode("utf-8"))
+        return fingerprint.hexdigest()[:32]
+
+    def get_b2_options_content(self):
+        """Command line options for b2, one per line, to be passed along by the
+        consumer recipe when it invokes b2 in this folder."""
+        return "-j%d\n" % self.b2_jobs
 
     @property
+    def b2_jobs(self):
+        """Number of parallel b2 jobs.
+
+        Taken from the b2_jobs option when set, otherwise the smallest of the
+        CPU count, the cgroup CPU quota and the available memory divided by
+        the b2_job_memory option (MiB per compiler process, default 1024).
+        """
+        jobs = self.generator_option("b2_jobs")
+        if jobs:
+            try:
+                return max(1, int(jobs))
+            except ValueError:
+                raise ConanException("Invalid value for b2_jobs: %s" % jobs)
+        jobs = tools.cpu_count()
+        cpu_limit = _cgroup_cpu_limit()
+        if cpu_limit:
+            jobs = min(jobs, cpu_limit)
+        job_memory = self.generator_option("b2_job_memory", "1024")
+        try:
+            job_memory = int(job_memory) * 1024 * 1024
+        except ValueError:
+            raise ConanException("Invalid value for b2_job_memory: %s" % job_memory)
+        memory = _available_memory()
+        if memory and job_memory > 0:
+            jobs = min(jobs, memory // job_memory)
+        return max(1, int(jobs))
+
+    def get_toolset_command(self, toolchain):
+        if not toolchain.compiler_launcher:
+            return '"%s"' % toolchain.toolset_exec
+        toolset_exec = toolchain.toolset_exec
+        if toolset_exec == "$(DEFAULT)":
+            toolset_exec = self.default_compiler
+        return '"%s" "%s"' % (toolchain.compiler_launcher, toolset_exec)
+
+    def get_launcher_stats(self, toolchain):
+        launcher_name = os.path.splitext(os.path.basename(toolchain.compiler_launcher))[0]
+        if launcher_name in ("ccache", "sccache"):
+            return 'ECHO [ SHELL "\\"%s\\" --show-stats" ] ;' % toolchain.compiler_launcher
+        return ''
+
+    _default_pch_headers = ["boost/config.hpp", "boost/mpl/if.hpp", "boost/type_traits.hpp",
+                            "boost/preprocessor.hpp"]
+
+    def pch_supported(self):
+        if self.b2_toolset in ['gcc', 'msvc']:
+            return True
+        # b2 only implements precompiled headers for clang on Linux-like targets
+        return self.b2_toolset == 'clang' and self.b2_os not in ['darwin', 'iphone']
+
+    @_resolved_once
+    def b2_pch_headers(self):
+        """The headers to precompile for the libraries to build, as
+        'library:header,...' entries separated by ';'.
+
+        The b2_pch option (or CONAN_B2_PCH) is 'none', 'default', a comma
+        separated header list used for every library, or ';' separated
+        'library:headers' entries, where headers may also be 'default'.
+        Headers not found in the include paths are left out.
+        """
+        spec = self.generator_choice("b2_pch")
+        if spec is None or not self.pch_supported():
+            return ''
+        if ":" in spec:
+            requested = {}
+            for entry in spec.split(";"):
+                library, _, headers = entry.partition(":")
+                if library.strip():
+                    requested[library.strip()] = headers
+            unknown = sorted(set(requested) - set(self.conanfile.lib_short_names))
+            if unknown:
+                raise ConanException("Invalid library name(s) in b2_pch: %s (libraries built: %s)" % (
+                    ", ".join(unknown), ", ".join(self.conanfile.lib_short_names)))
+        else:
+            requested = dict((library, spec) for library in self.conanfile.lib_short_names)
+
+        entries = []
+        for library in sorted(self.conanfile.lib_short_names):
+            headers = requested.get(library, "").strip()
+            if headers.lower() == "default":
+                headers = self._default_pch_headers
+            else:
+                headers = [header.strip() for header in headers.split(",") if header.strip()]
+            include_paths = list(self.conanfile.deps_cpp_info.includedirs)
+            if self.output_folder:
+                include_paths.append(os.path.join(self.output_folder, library, "include"))
+            headers = [header for header in headers
+                       if any(os.path.isfile(os.path.join(path, header)) for path in include_paths)]
+            if headers:
+                entries.append("%s:%s" % (library, ",".join(headers)))
+        return ";".join(entries)
+
+    def get_pch_headers(self, toolchain):
+        """Maps the libraries to build to the headers to precompile for them."""
+        return dict((library, headers.split(","))
+                    for library, _, headers in (entry.partition(":")
+                                                for entry in toolchain.pch_headers.split(";") if entry))
+
+    def get_pch_header_contents(self, toolchain):
+        return dict(("boost-pch/boost-pch-%s.hpp" % library,
+                     "// Headers precompiled for the %s library\n" % library +
+                     "".join("#include <%s>\n" % header for header in headers))
+                    for library, headers in self.get_pch_headers(toolchain).items())
+
+    def get_pch_for_jamfile(self, toolchain):
+        pch_headers = self.get_pch_headers(toolchain)
+        if not pch_headers:
+            return ''
+        # The header lives in its own folder: gcc looks for -include files in
+        # the working directory first, and would pick the header over the PCH.
+        # lib_target declares the PCH targets in the libraries' projects.
+        lines = ["import pch ;"]
+        for library in sorted(pch_headers):
+            lines.extend(['PCH_HEADER(%s) = boost-pch-%s.hpp ;' % (library, library),
+                          'alias %s-pch-header : boost-pch/boost-pch-%s.hpp ;' % (library, library),
+                          'explicit %s-pch-header ;' % library])
+        return "\n".join(lines)
+
+    def get_unity_for_jamfile(self):
+        """Unity build settings for the jamroot.
+
+        The b2_unity option (or CONAN_B2_UNITY) is the number of unity
+        translation units each library's sources are combined into, 0 to
+        disable. b2_unity_exclude lists ';' separated 'library:source,...'
+        entries of source files that are compiled on their own, given by
+        their path relative to the library's source directory (e.g.
+        'log:posix/ipc_sync_wrappers.cpp'); a library without sources is
+        left out of the unity build entirely.
+        """
+        unity = self.generator_option("b2_unity", "0")
+        try:
+            unity = int(unity)
+        except ValueError:
+            raise ConanException("Invalid value for b2_unity: %s" % unity)
+        if unity <= 0:
+            return ''
+        lines = ["UNITY_SLOTS = %s ;" % " ".join(str(slot) for slot in range(1, unity + 1))]
+        for entry in (self.generator_option("b2_unity_exclude") or "").split(";"):
+            library, _, sources = entry.partition(":")
+            if not library.strip():
+                continue
+            sources = ['"%s"' % re.sub(r"^(\./)+", "", source.strip().replace('\\', '/'))
+                       for source in sources.split(",") if source.strip()] or ['"*"']
+            lines.append("UNITY_EXCLUDE(%s) = %s ;" % (library.strip(), " ".join(sources)))
+        return "\n".join(lines)
+
+    def get_project_config_content(self, toolchain=None):
+        toolchain = toolchain or self.resolve_toolchain()
+        return self.get_template("project-config.template.jam").render(self.project_config_placeholders(toolchain))
+
+    def project_config_placeholders(self, toolchain):
+        placeholders = {
+            "toolset": toolchain.toolset,
+            "toolset_version": toolchain.toolset_version,
+            "toolset_command": lambda: self.get_toolset_command(toolchain),
+            "native_dependencies": self.get_native_dependencies_for_jamfile,
+            "python_exec": lambda: self.b2_python_exec,
+            "python_version": lambda: self.b2_python_version,
+            "python_include": lambda: self.b2_python_include,
+            "python_lib": lambda: self.b2_python_lib,
+            "mpicxx": lambda: self.b2_mpicxx,
+            "archive_tools": toolchain.archive_tools,
+        }
+        if self.header_only:
+            placeholders.update(self.header_only_project_config_placeholders)
+        return placeholders
+
+    header_only_project_config_placeholders = dict(
+        ("python_" + field, "") for field in ("exec", "version", "include", "lib"))
+
+    @_resolved_once
     def b2_os(self):
         b2_os = {
             'Windows': 'windows',
@@ -157,7 +1089,7 @@ class boost(Generator):
             'SunOS': 'solaris'}
         return b2_os[str(self.settings.os)]
 
-    @property
+    @_resolved_once
     def b2_address_model(self):
         b2_address_model = {
             'x86': '32',
@@ -170,7 +1102,7 @@ class boost(Generator):
             'armv8': '64'}
         return b2_address_model[str(self.settings.arch)]
 
-    @property
+    @_resolved_once
     def b2_architecture(self):
         if str(self.settings.arch).startswith('x86'):
             return 'x86'
@@ -181,14 +1113,14 @@ class boost(Generator):
         else:
             return ""
 
-    @property
+    @_resolved_once
     def b2_variant(self):
         if str(self.settings.build_type) == "Debug":
             return "debug"
         else:
             return "release"
 
-    @property
+    @_resolved_once
     def b2_toolset(self):
         b2_toolsets = {
             'gcc': 'gcc',
@@ -197,7 +1129,7 @@ class boost(Generator):
             'apple-clang': 'clang'}
         return b2_toolsets[str(self.settings.compiler)]
 
-    @property
+    @_resolved_once
     def b2_toolset_version(self):
         if self.settings.compiler == "Visual Studio":
             if self.settings.compiler.version == "15":
@@ -208,54 +1140,99 @@ class boost(Generator):
             return "$(DEFAULT)"
 
     @property
+    def default_compiler(self):
+        """The compiler driver b2 runs for the gcc and clang toolsets when the
+        toolset command is $(DEFAULT)."""
+        return {"gcc": "g++", "clang": "clang++"}.get(self.b2_toolset)
+
+    @_resolved_once
     def b2_toolset_exec(self):
         if self.b2_os in ['linux', 'freebsd', 'solaris', 'darwin', 'android'] or \
                 (self.b2_os == 'windows' and self.b2_toolset == 'gcc'):
-
-            class dev_null(object):
-
-                def write(self, message):
-                    pass
-
+            candidates = []
             if 'CXX' in os.environ:
-                try:
-                    self.conanfile.run(os.environ['CXX'] + ' --version', output=dev_null())
-                    return os.environ['CXX']
-                except:
-                    pass
+                _split_command(os.environ['CXX'], "CXX")  # fails here, naming CXX, if it can not be split
+                candidates.append(os.environ['CXX'])
             version = str(self.settings.compiler.version).split('.')
             result_x = self.b2_toolset.replace('gcc', 'g++') + "-" + version[0]
             result_xy = result_x
             if len(version) > 1:
                 result_xy += version[1] if version[1] != '0' else ''
+            candidates.append(result_xy)
+            if result_x != result_xy:
+                candidates.append(result_x)
+
+            return self.probe_executable(candidates) or "$(DEFAULT)"
+        elif self.b2_os == "windows":
+            return self.win_cl_exe or "$(DEFAULT)"
+        else:
+            return "$(DEFAULT)"
+
+    def probe_executable(self, candidates):
+        """Returns the first of the candidate commands that runs with '--version'.
+
+        The answer is persisted in the probe cache, keyed on the compiler
+        settings, CXX and PATH, and invalidated when any of the candidate
+        executables is installed, removed or modified.
+        """
+        key = json.dumps(["toolset_exec", str(self.settings.os), str(self.settings.compiler),
+                          str(self.settings.compiler.version), os.environ.get('CXX', ''),
+                          os.environ.get('PATH', ''), candidates])
+        return self.cached_probe(key, candidates, lambda: self._probe_executable(candidates))
+
+    def _probe_executable(self, candidates):
 
+        class dev_null(object):
+
+            def write(self, message):
+                pass
+
+        for candidate in candidates:
             try:
-                self.conanfile.run(result_xy + " --version", output=dev_null())
-                return result_xy
+                with _trace.timed("commands", candidate + " --version"):
+                    self.conanfile.run(candidate + " --version", output=dev_null())
+                return candidate
             except:
                 pass
+        return None
+
+    def cached_probe(self, key, commands, probe):
+        stamps = dict((command, self.executable_mtime(command)) for command in commands)
+        cache = _probe_cache()
+        found, result = cache.lookup(key, stamps)
+        if not found:
+            result = probe()
+            cache.store(key, stamps, result)
+        return result
+
+    def executable_mtime(self, command):
+        """Modification times of every word of command that is an executable,
+        so that upgrading any of them (e.g. the compiler behind
+        'ccache g++') invalidates the probes depending on it."""
+        mtimes = []
+        for word in _split_command(command):
+            program = word if os.path.isfile(word) else tools.which(word)
+            if not program:
+                continue
+            _trace.file(program, "stat")
             try:
-                self.conanfile.run(result_x + " --version", output=dev_null())
-                return result_x
-            except:
+                mtimes.append(os.path.getmtime(program))
+            except OSError:
                 pass
-            return "$(DEFAULT)"
-        elif self.b2_os == "windows":
-            return self.win_cl_exe or "$(DEFAULT)"
-        else:
-            return "$(DEFAULT)"
+        return mtimes
 
     @property
     def win_cl_exe(self):
         vs_root = tools.vs_installation_path(str(self.settings.compiler.version))
         if vs_root:
+            _trace.file(os.path.join(vs_root, "VC"), "glob")
             cl_exe = \
                 glob.glob(os.path.join(vs_root, "VC", "Tools", "MSVC", "*", "bin", "*", "*", "cl.exe")) + \
                 glob.glob(os.path.join(vs_root, "VC", "bin", "cl.exe"))
             if cl_exe:
                 return cl_exe[0].replace("\\", "/")
 
-    @property
+    @_resolved_once
     def b2_link(self):
         shared = False
         try:
@@ -264,121 +1241,90 @@ class boost(Generator):
             pass
         return "shared" if shared else "static"
 
-    @property
+    @_resolved_once
     def b2_runtime_link(self):
         if self.settings.compiler == "Visual Studio" and self.settings.compiler.runtime:
             return "static" if "MT" in str(self.settings.compiler.runtime) else "$(DEFAULT)"
         return "$(DEFAULT)"
 
-    @property
-    def zlib_lib_paths(self):
+    # Options changing the binaries that are built. They must be options of
+    # the consumer, which are part of its package ID, and are never taken
+    # from the environment.
+    _binary_options = frozenset(["b2_variants", "b2_links", "b2_runtime_links", "b2_threading",
+                                 "b2_lto", "b2_pgo", "b2_march", "b2_mtune", "b2_visibility",
+                                 "b2_gc_sections", "b2_as_needed"])
+
+    def generator_option(self, name, default=None):
+        """Returns a generator option, taken from the consumer's options or,
+        when the consumer does not define it and it is not one of the
+        _binary_options, from the CONAN_<NAME> environment variable."""
+        value = None
         try:
-            if self.conanfile.options.use_zlib:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["zlib"].lib_paths)).replace('\\', '/')
+            value = getattr(self.conanfile.options, name)
         except:
             pass
-        return ""
-
-    @property
-    def zlib_include_paths(self):
-        try:
-            if self.conanfile.options.use_zlib:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["zlib"].include_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def zlib_lib_name(self):
-        try:
-            if self.conanfile.options.use_zlib:
-                return os.path.basename(self.deps_build_info["zlib"].libs[0])
-        except:
-            pass
-        return ""
-
-    @property
-    def bzip2_lib_paths(self):
-        try:
-            if self.conanfile.options.use_bzip2:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["bzip2"].lib_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def bzip2_include_paths(self):
-        try:
-            if self.conanfile.options.use_bzip2:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["bzip2"].include_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def bzip2_lib_name(self):
-        try:
-            if self.conanfile.options.use_bzip2:
-                return os.path.basename(self.deps_build_info["bzip2"].libs[0])
-        except:
-            pass
-        return ""
-
-    @property
-    def lzma_lib_paths(self):
-        try:
-            if self.conanfile.options.use_lzma:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["lzma"].lib_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def lzma_include_paths(self):
-        try:
-            if self.conanfile.options.use_lzma:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["lzma"].include_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def lzma_lib_name(self):
-        try:
-            if self.conanfile.options.use_lzma:
-                return os.path.basename(self.deps_build_info["lzma"].libs[0])
-        except:
-            pass
-        return ""
-
-    @property
-    def zstd_lib_paths(self):
-        try:
-            if self.conanfile.options.use_zstd:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["zstd"].lib_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def zstd_include_paths(self):
-        try:
-            if self.conanfile.options.use_zstd:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["zstd"].include_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
-
-    @property
-    def zstd_lib_name(self):
-        try:
-            if self.conanfile.options.use_zstd:
-                return os.path.basename(self.deps_build_info["zstd"].libs[0])
-        except:
-            pass
-        return ""
-
-    @property
+        if value is None or str(value) == "None":
+            variable = "CONAN_" + name.upper()
+            if name not in self._binary_options:
+                value = os.environ.get(variable)
+            elif variable in os.environ:
+                self.conanfile.output.warn("boost: ignoring %s, %s changes the binaries and is only taken from "
+                                           "the consumer's options" % (variable, name))
+        if value is None or str(value) == "None":
+            return default
+        return str(value)
+
+    def generator_option_list(self, name, allowed=None):
+        values = (self.generator_option(name) or "").replace(",", " ").split()
+        if allowed is not None:
+            invalid = [value for value in values if value not in allowed]
+            if invalid:
+                raise ConanException("Invalid value(s) for %s: %s (possible values: %s)" % (
+                    name, ", ".join(invalid), ", ".join(allowed)))
+        return values
+
+    _off_values = ("none", "false", "0", "")
+
+    def generator_choice(self, name, allowed=None):
+        """Returns a generator option that can be switched off, or None when it
+        is unset or 'none', 'false', '0' or empty.
+
+        With allowed, the value is lower-cased and must be one of them.
+        """
+        value = self.generator_option(name)
+        if value is None or value.lower() in self._off_values:
+            return None
+        if allowed is not None:
+            value = value.lower()
+            if value not in allowed:
+                raise ConanException("Invalid value for %s: %s (possible values: none, %s)" % (
+                    name, value, ", ".join(allowed)))
+        return value
+
+    def generator_flag(self, name, default=False):
+        value = self.generator_option(name)
+        if value is None:
+            return default
+        if value.lower() in ("1", "true", "yes", "on"):
+            return True
+        if value.lower() in ("0", "false", "no", "off", ""):
+            return False
+        raise ConanException("Invalid value for %s: %s (possible values: True, False)" % (name, value))
+
+    @_resolved_once
+    def b2_variants(self):
+        return " ".join(self.generator_option_list("b2_variants") or [self.b2_variant])
+
+    @_resolved_once
+    def b2_links(self):
+        return " ".join(self.generator_option_list("b2_links", ["static", "shared"]) or [self.b2_link])
+
+    @_resolved_once
+    def b2_runtime_links(self):
+        return " ".join(self.generator_option_list("b2_runtime_links", ["static", "shared"]) or
+                        [self.b2_runtime_link])
+
+    @_resolved_once
     def b2_cxxstd(self):
         # for now, we use C++11 as default, unless we're targeting libstdc++ (not 11)
         if self.b2_toolset in ['gcc', 'clang'] and self.b2_os != 'android':
@@ -386,7 +1332,7 @@ class boost(Generator):
                 return '<cxxflags>-std=c++11 <linkflags>-std=c++11'
         return ''
 
-    @property
+    @_resolved_once
     def b2_cxxabi(self):
         if self.b2_toolset in ['gcc', 'clang'] and self.b2_os != 'android':
             if str(self.settings.compiler.libcxx) == 'libstdc++11':
@@ -395,7 +1341,7 @@ class boost(Generator):
                 return '<define>_GLIBCXX_USE_CXX11_ABI=0'
         return ''
 
-    @property
+    @_resolved_once
     def b2_libcxx(self):
         if self.b2_toolset == 'clang' and self.b2_os != 'android':
             if str(self.settings.compiler.libcxx) == 'libc++':
@@ -437,14 +1383,33 @@ class boost(Generator):
         except:
             return ""
 
+    @property
+    def native_dependencies(self):
+        """Maps the names of the enabled _native_dependencies the consumer
+        depends on to their (lib_paths, include_paths, lib_name), resolved
+        once per generator."""
+        resolved_dependencies = getattr(self, "_resolved_native_dependencies", None)
+        if resolved_dependencies is None:
+            resolved_dependencies = {}
+            if not self.header_only:
+                for dependency in _native_dependencies:
+                    resolved = dependency.resolve(self.conanfile.options, self.deps_build_info)
+                    if resolved:
+                        resolved_dependencies[dependency.name] = resolved
+            self._resolved_native_dependencies = resolved_dependencies
+        return resolved_dependencies
+
+    def get_native_dependencies_for_jamfile(self):
+        lines = []
+        for dependency in _native_dependencies:
+            if dependency.module:
+                lines.extend(dependency.jam_lines(self.native_dependencies.get(dependency.name)))
+        return "\n".join(lines)
+
     @property
     def b2_icu_lib_paths(self):
-        try:
-            if self.conanfile.options.use_icu:
-                return '"{0}"'.format('" "'.join(self.deps_build_info["icu"].lib_paths)).replace('\\', '/')
-        except:
-            pass
-        return ""
+        lib_paths = self.native_dependencies.get("icu", ((), (), ""))[0]
+        return _jam_paths(lib_paths)
 
     @property
     def apple_arch(self):
@@ -473,38 +1438,192 @@ class boost(Generator):
         return None
 
     def command_output(self, command):
-        if sys.version_info.major >= 3:
-            return subprocess.check_output(command, shell=False, encoding=locale.getpreferredencoding()).strip()
-        else:
-            return subprocess.check_output(command, shell=False).strip()
+        with _trace.timed("commands", " ".join(command)):
+            if sys.version_info.major >= 3:
+                return subprocess.check_output(command, shell=False, encoding=locale.getpreferredencoding()).strip()
+            else:
+                return subprocess.check_output(command, shell=False).strip()
 
     @property
     def apply_isysroot(self):
         return self.command_output(['xcrun', '--show-sdk-path', '-sdk', self.apple_sdk])
 
-    @property
+    @_resolved_once
     def b2_arch_flags(self):
         if self.b2_os == 'darwin' or self.b2_os == 'iphone':
             return '<flags>"-arch {0}" <linkflags>"-arch {0}"'.format(self.apple_arch)
         return ''
 
-    @property
+    # msvc /arch switches for each target architecture, and the x86-64
+    # microarchitecture levels they implement
+    _msvc_arch_switches = {
+        "x86": ["IA32", "SSE", "SSE2", "AVX", "AVX2", "AVX512"],
+        "x86_64": ["AVX", "AVX2", "AVX512"],
+    }
+    _msvc_cpu_levels = {
+        "x86-64-v3": "AVX2",
+        "x86-64-v4": "AVX512",
+    }
+
+    @_resolved_once
+    def b2_cpu_flags(self):
+        """Flags tuning the build for a target CPU, from the consumer's
+        b2_march and b2_mtune options (e.g. 'x86-64-v3', 'skylake' or 'native').
+
+        With gcc and clang they become -march/-mtune, checked against the
+        compiler once and cached; msvc gets the matching /arch switch. Values
+        that do not fit the target architecture are rejected.
+        """
+        march = self.generator_option("b2_march")
+        mtune = self.generator_option("b2_mtune")
+        if not march and not mtune:
+            return ''
+        arch = str(self.settings.arch)
+        if march and march.startswith("x86-64") and arch not in ("x86", "x86_64"):
+            raise ConanException("Invalid value for b2_march with arch=%s: %s" % (arch, march))
+        if self.b2_toolset == 'msvc':
+            if mtune:
+                self.conanfile.output.warn("boost: b2_mtune is not supported with msvc, ignoring it")
+            if not march:
+                return ''
+            if arch not in self._msvc_arch_switches:
+                raise ConanException("boost: b2_march is not supported with msvc for arch=%s" % arch)
+            if arch == "x86_64" and march == "x86-64":
+                return ''  # the baseline msvc already targets
+            allowed = self._msvc_arch_switches[arch]
+            if arch == "x86_64":
+                march = self._msvc_cpu_levels.get(march, march)
+                allowed = ["x86-64"] + sorted(self._msvc_cpu_levels) + allowed
+            switch = march.upper()
+            if switch not in self._msvc_arch_switches[arch]:
+                raise ConanException("Invalid value for b2_march with msvc and arch=%s: %s (possible values: %s)"
+                                     % (arch, march, ", ".join(allowed)))
+            return '<cflags>/arch:' + switch
+        if self.b2_toolset not in ['gcc', 'clang']:
+            self.conanfile.output.warn("boost: b2_march/b2_mtune are not supported with %s, ignoring them"
+                                       % self.b2_toolset)
+            return ''
+        flags = []
+        if march:
+            flags.append("-march=" + march)
+        if mtune:
+            flags.append("-mtune=" + mtune)
+        if not self.compiler_accepts(flags):
+            raise ConanException("boost: the compiler does not accept %s" % " ".join(flags))
+        return '\n'.join('<cflags>' + flag for flag in flags)
+
+    def compiler_accepts(self, flags, link=False, executables=()):
+        """Tells whether the gcc or clang compiler of the toolset compiles (and
+        with link=True, links) a trivial program with the given flags.
+
+        The answer is persisted in the probe cache, like the compiler probe,
+        and also invalidated when any of the given executables changes.
+        """
+        compiler = self.b2_toolset_exec
+        if compiler == "$(DEFAULT)":
+            compiler = self.default_compiler
+        key = json.dumps(["compiler_accepts", compiler, os.environ.get('PATH', ''), flags, link])
+        return self.cached_probe(key, [compiler] + list(executables),
+                                 lambda: self._compiler_accepts(compiler, flags, link))
+
+    def _compiler_accepts(self, compiler, flags, link):
+        command = _split_command(compiler) + flags + ["-x", "c++", "-"]
+        command += ["-o", os.devnull] if link else ["-fsyntax-only"]
+        with _trace.timed("commands", " ".join(command)):
+            try:
+                with open(os.devnull, "w") as dev_null:
+                    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=dev_null, stderr=dev_null)
+                    process.communicate(b"int main() { return 0; }\n")
+                return process.returncode == 0
+            except OSError:
+                return False
+
+    @_resolved_once
     def b2_isysroot(self):
         if self.b2_os == 'darwin' or self.b2_os == 'iphone':
             return '<flags>"-isysroot {0}"'.format(self.apply_isysroot)
         return ''
 
-    @property
+    @_resolved_once
     def b2_os_version(self):
         if (self.b2_os == 'darwin' or self.b2_os == 'iphone') and self.settings.get_safe("os.version"):
             return '<flags>"{0}"'.format(tools.apple_deployment_target_flag(self.settings.os,
                                                                             self.settings.os.version))
         return ''
 
-    @property
+    @_resolved_once
     def b2_fpic(self):
-        if self.b2_os != 'windows' and self.b2_toolset in ['gcc', 'clang'] and self.b2_link == 'static':
-            return '<flags>-fPIC\n<cxxflags>-fPIC'
+        if self.b2_os != 'windows' and self.b2_toolset in ['gcc', 'clang'] and 'static' in self.b2_links.split():
+            if self.b2_links == 'static':
+                return '<flags>-fPIC\n<cxxflags>-fPIC'
+            return '<link>static:<flags>-fPIC\n<link>static:<cxxflags>-fPIC'
+        return ''
+
+    @_resolved_once
+    def b2_shared_flags(self):
+        """Requirements that make shared libraries smaller and faster to load,
+        from the consumer's options: hidden symbol visibility
+        (b2_visibility=hidden), section garbage collection (b2_gc_sections)
+        and dropping unused DT_NEEDED entries (b2_as_needed)."""
+        if 'shared' not in self.b2_links.split():
+            return ''
+        flags = []
+        visibility = self.generator_option("b2_visibility")
+        if visibility:
+            if visibility not in ("global", "protected", "hidden"):
+                raise ConanException("Invalid value for b2_visibility: %s (possible values: global, protected, "
+                                     "hidden)" % visibility)
+            flags.append('<visibility>' + visibility)
+        darwin = self.b2_os == 'darwin' or self.b2_os == 'iphone'
+        if self.generator_flag("b2_gc_sections"):
+            if self.b2_toolset == 'msvc':
+                flags += ['<cflags>/Gy', '<cflags>/Gw', '<linkflags>/OPT:REF', '<linkflags>/OPT:ICF']
+            elif self.b2_toolset in ['gcc', 'clang']:
+                flags += ['<cflags>-ffunction-sections', '<cflags>-fdata-sections',
+                          '<linkflags>-Wl,-dead_strip' if darwin else '<linkflags>-Wl,--gc-sections']
+        if self.generator_flag("b2_as_needed"):
+            if self.b2_toolset in ['gcc', 'clang'] and not darwin and self.b2_os != 'windows':
+                flags.append('<linkflags>-Wl,--as-needed')
+            else:
+                self.conanfile.output.warn("boost: b2_as_needed is not supported for this target, ignoring it")
+        if self.b2_links != 'shared':
+            flags = ['<link>shared:' + flag for flag in flags]
+        return '\n'.join(flags)
+
+    # Linkers in order of preference for 'auto', with the executables the
+    # compiler driver looks for
+    _fast_linkers = [
+        ("mold", ["ld.mold", "mold"]),
+        ("lld", ["ld.lld", "ld64.lld"]),
+        ("gold", ["ld.gold"]),
+    ]
+
+    @_resolved_once
+    def b2_linker_flags(self):
+        """Selects the linker with -fuse-ld for gcc and clang.
+
+        Set with the b2_linker option or CONAN_B2_LINKER to 'none', 'auto'
+        (the first of mold, lld and gold that links a test program) or a
+        linker name; a linker that does not work is skipped with a warning.
+        """
+        linker = self.generator_choice("b2_linker")
+        if linker is None:
+            return ''
+        linker = linker.lower()
+        if self.b2_toolset not in ['gcc', 'clang']:
+            self.conanfile.output.warn("boost: linker selection is not supported with %s, ignoring it"
+                                       % self.b2_toolset)
+            return ''
+        if linker == "auto":
+            candidates = self._fast_linkers
+        else:
+            candidates = [(linker, dict(self._fast_linkers).get(linker, ["ld." + linker]))]
+        for name, executables in candidates:
+            if self.compiler_accepts(["-fuse-ld=" + name], link=True, executables=executables):
+                return '<linkflags>-fuse-ld=' + name
+        if linker != "auto":
+            self.conanfile.output.warn("boost: linker '%s' does not work with %s, using the default linker"
+                                       % (linker, self.b2_toolset))
         return ''
 
     @property
@@ -514,11 +1633,13 @@ class boost(Generator):
         except:
             return ''
 
-    @property
+    @_resolved_once
     def b2_threading(self):
-        return 'multi'
+        """Threading flavours to build, from the consumer's b2_threading
+        option: 'multi' (the default), 'single' or both."""
+        return " ".join(self.generator_option_list("b2_threading", ["single", "multi"]) or ["multi"])
 
-    @property
+    @_resolved_once
     def b2_threadapi(self):
         try:
             result = str(self.conanfile.options.threadapi)
@@ -538,7 +1659,7 @@ class boost(Generator):
         else:
             return 'pthread'
 
-    @property
+    @_resolved_once
     def b2_profile_flags(self):
         def format_b2_flags(token, flags):
             return '%s"%s"' % (token, flags)
@@ -555,22 +1676,182 @@ class boost(Generator):
         else:
             return ''
 
+    @_resolved_once
+    def b2_lto(self):
+        """Link-time optimization mode: 'none', 'full' or 'thin' (clang only).
+
+        Set with the consumer's b2_lto option.
+        """
+        lto = self.generator_choice("b2_lto", ["full", "thin", "on", "true", "1"])
+        if lto is None:
+            return "none"
+        if lto != "thin":
+            return "full"
+        if self.b2_toolset != 'clang':
+            self.conanfile.output.warn("boost: thin LTO needs clang, using full LTO with %s"
+                                       % self.b2_toolset)
+            return "full"
+        return "thin"
+
+    @_resolved_once
+    def b2_lto_jobs(self):
+        """Parallel jobs of the LTO link step from the b2_lto_jobs option, or
+        None to let the toolchain decide.
+
+        Not derived from the host's free memory like b2_jobs: the value ends
+        up in the jamroot, which must not change from one run to the next.
+        """
+        jobs = self.generator_option("b2_lto_jobs")
+        if jobs:
+            try:
+                return max(1, int(jobs))
+            except ValueError:
+                raise ConanException("Invalid value for b2_lto_jobs: %s" % jobs)
+        return None
+
+    @_resolved_once
+    def b2_lto_flags(self):
+        if self.b2_lto == "none":
+            return ''
+        jobs = self.b2_lto_jobs
+        if self.b2_toolset == 'gcc':
+            if jobs is None:
+                # gcc 10 sizes the LTO link itself, older ones need a count
+                version = str(self.settings.compiler.version).split('.')[0]
+                jobs = 'auto' if version.isdigit() and int(version) >= 10 else tools.cpu_count()
+            return '<cflags>-flto=%s\n<linkflags>-flto=%s' % (jobs, jobs)
+        if self.b2_toolset == 'clang':
+            flags = '<cflags>-flto=%s\n<linkflags>-flto=%s' % (self.b2_lto, self.b2_lto)
+            if self.b2_lto == "thin" and jobs is not None:
+                flags += '\n<linkflags>-flto-jobs=%d' % jobs
+            return flags
+        if self.b2_toolset == 'msvc':
+            return '<cflags>/GL\n<linkflags>/LTCG\n<archiveflags>/LTCG'
+        self.conanfile.output.warn("boost: LTO is not supported with %s, ignoring it" % self.b2_toolset)
+        return ''
+
     @property
-    def b2_profile_tools(self):
-        if self.b2_toolset == 'gcc' or self.b2_toolset == 'clang':
-            additional_flags = []
-            if 'SYSROOT' in os.environ:
-                additional_flags.append('<root>"%s"' % os.environ['SYSROOT'])
-            if 'AR' in os.environ:
-                additional_flags.append('<archiver>"%s"' % os.environ['AR'])
-            if 'RANLIB' in os.environ:
-                additional_flags.append('<ranlib>"%s"' % os.environ['RANLIB'])
-            if self.b2_os == 'darwin' or self.b2_os == 'iphone':
-                if 'STRIP' in os.environ:
-                    additional_flags.append('<striper>"%s"' % os.environ['STRIP'])
-            additional_flags = ' '.join(additional_flags)
-            if len(additional_flags):
-                additional_flags = ': ' + additional_flags
-            return additional_flags
+    def lto_archive_tools(self):
+        """(archiver, ranlib) that understand the LTO objects of the toolset,
+        looked up next to the compiler, or (None, None) when not needed."""
+        if self.b2_lto == "none" or self.b2_toolset not in ['gcc', 'clang'] or \
+                self.b2_os in ['darwin', 'iphone']:
+            return None, None
+        toolset_exec = self.b2_toolset_exec
+        if toolset_exec == "$(DEFAULT)":
+            toolset_exec = self.default_compiler
+        folder, compiler = os.path.split(_split_command(toolset_exec)[-1])
+        if self.b2_toolset == 'gcc':
+            driver, archive_tools = r"g\+\+", ("gcc-ar", "gcc-ranlib")
         else:
+            driver, archive_tools = r"clang\+\+", ("llvm-ar", "llvm-ranlib")
+        # Prefer the tools matching the compiler (e.g. gcc-ar-9 for g++-9),
+        # then the unversioned ones on PATH
+        candidates = []
+        for tool in archive_tools:
+            name = re.sub(driver, tool, compiler)
+            candidates.append([os.path.join(folder, name).replace('\\', '/'), tool] if name != compiler else [tool])
+        found = [self._find_program(tool_candidates) for tool_candidates in candidates]
+        if not all(found):
+            self.conanfile.output.warn("boost: %s not found, static libraries may lack LTO symbol tables"
+                                       % " or ".join(sum(candidates, [])))
+            return None, None
+        return tuple(found)
+
+    @_resolved_once
+    def b2_pgo(self):
+        """Profile-guided optimization stage: 'none', 'generate' to build
+        instrumented libraries or 'use' to build with the collected profile.
+
+        Set with the consumer's b2_pgo option, the profile directory with
+        b2_pgo_dir (default: boost-pgo in the install folder).
+        """
+        return self.generator_choice("b2_pgo", ["generate", "use"]) or "none"
+
+    @property
+    def pgo_dir(self):
+        pgo_dir = self.generator_option("b2_pgo_dir")
+        if not pgo_dir:
+            pgo_dir = os.path.join(self.output_folder or os.getcwd(), "boost-pgo")
+        return os.path.abspath(pgo_dir).replace('\\', '/')
+
+    @_resolved_once
+    def b2_pgo_flags(self):
+        if self.b2_pgo == "none":
+            return ''
+        if self.b2_toolset not in ['gcc', 'clang']:
+            self.conanfile.output.warn("boost: PGO is not supported with %s, ignoring it" % self.b2_toolset)
+            return ''
+        pgo_dir = self.pgo_dir
+        if self.b2_pgo == "generate":
+            return '<cflags>"-fprofile-generate=%s"\n<linkflags>"-fprofile-generate=%s"' % (pgo_dir, pgo_dir)
+        if not os.path.isdir(pgo_dir):
+            raise ConanException("boost: PGO profile directory %s does not exist, "
+                                 "build and run with b2_pgo=generate first" % pgo_dir)
+        if self.b2_toolset == 'gcc':
+            return '<cflags>"-fprofile-use=%s"\n<cflags>-fprofile-correction' % pgo_dir
+        return '<cflags>"-fprofile-use=%s"' % self.merge_clang_profile(pgo_dir)
+
+    def merge_clang_profile(self, pgo_dir):
+        """Merges the raw profiles clang wrote into pgo_dir into the
+        default.profdata file that -fprofile-use reads, when it is stale."""
+        profdata = os.path.join(pgo_dir, "default.profdata").replace('\\', '/')
+        _trace.file(pgo_dir, "glob")
+        raw_profiles = glob.glob(os.path.join(pgo_dir, "*.profraw"))
+        if raw_profiles and (not os.path.isfile(profdata) or
+                             max(os.path.getmtime(raw) for raw in raw_profiles) > os.path.getmtime(profdata)):
+            toolset_exec = self.b2_toolset_exec
+            llvm_profdata = "llvm-profdata"
+            if toolset_exec != "$(DEFAULT)":
+                folder, compiler = os.path.split(toolset_exec)
+                llvm_profdata = os.path.join(folder, re.sub(r"clang\+\+", "llvm-profdata", compiler))
+            command = '"%s" merge -output="%s" %s' % (
+                llvm_profdata, profdata, " ".join('"%s"' % raw.replace('\\', '/') for raw in raw_profiles))
+            with _trace.timed("commands", command):
+                self.conanfile.run(command)
+        elif not os.path.isfile(profdata):
+            raise ConanException("boost: no clang profile found in %s" % pgo_dir)
+        return profdata
+
+    _compiler_launchers = ["sccache", "ccache"]
+
+    @_resolved_once
+    def b2_compiler_launcher(self):
+        """Compiler launcher (ccache, sccache or a user supplied command) that
+        wraps the compiler in the toolset declaration, or '' if none.
+
+        Set with the b2_compiler_launcher option or CONAN_B2_COMPILER_LAUNCHER:
+        'auto' picks the first of sccache and ccache found on PATH.
+        """
+        launcher = self.generator_choice("b2_compiler_launcher")
+        if launcher is None:
+            return ''
+        if self.b2_toolset not in ['gcc', 'clang']:
+            self.conanfile.output.warn("boost: compiler launcher '%s' is not supported with %s, ignoring it"
+                                       % (launcher, self.b2_toolset))
+            return ''
+        # Looking the launcher up on PATH is as cheap as validating a cached answer
+        candidates = self._compiler_launchers if launcher.lower() == "auto" else [launcher]
+        found = self._find_program(candidates)
+        if not found:
+            self.conanfile.output.warn("boost: compiler launcher '%s' not found, building without it" % launcher)
+            return ''
+        return found
+
+    def _find_program(self, candidates):
+        for candidate in candidates:
+            found = candidate if os.path.isfile(candidate) else tools.which(candidate)
+            if found:
+                return found.replace('\\', '/')
+        return None
+
+    @_resolved_once
+    def b2_archive_tools(self):
+        """Toolset options selecting an archiver and ranlib that understand
+        LTO objects, AR and RANLIB taking precedence; empty without LTO."""
+        archiver, ranlib = self.lto_archive_tools
+        if archiver is None:
             return ''
+        archiver = os.environ.get('AR', archiver)
+        ranlib = os.environ.get('RANLIB', ranlib)
+        return ' : <archiver>"%s" <ranlib>"%s"' % (archiver, ranlib)